@@ -3,9 +3,13 @@ from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from typing import Any, Dict, List, Optional
 
+import numpy as np
+import orjson
 import pandas as pd
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ==========================================
 # App Title (UI in Romanian)
@@ -17,7 +21,15 @@ st.title("Jurnal de evenimente — filtru staționare")
 # ==========================================
 FM_API_BASE = "https://api.fm-track.com"
 EVENTS_BASE = "http://192.168.88.175:9877/api"
-APP_TZ = ZoneInfo("Europe/Bucharest")  # default display timezone
+
+
+@st.cache_resource(show_spinner=False)
+def get_zoneinfo(name: str) -> ZoneInfo:
+    """ZoneInfo lookup touches the tz database; cache per name across reruns."""
+    return ZoneInfo(name)
+
+
+APP_TZ = get_zoneinfo("Europe/Bucharest")  # default display timezone
 
 # ==========================================
 # Sidebar — Romanian labels
@@ -46,10 +58,16 @@ stationary_under = st.sidebar.number_input(
     "Staționare sub (minute)", min_value=0, max_value=99, step=1, value=0
 )
 
+# Cache-bust counter for the events cache (bumped from the sidebar)
+if "events_cache_bust" not in st.session_state:
+    st.session_state.events_cache_bust = 0
+if st.sidebar.button("Reîncarcă datele (ignoră cache)"):
+    st.session_state.events_cache_bust += 1
+
 # Optional display timezone
 user_tz_name = st.sidebar.text_input("Fus orar de afișare (IANA)", value="Europe/Bucharest")
 try:
-    display_tz = ZoneInfo(user_tz_name)
+    display_tz = get_zoneinfo(user_tz_name)
 except Exception:
     st.sidebar.warning("Fus orar invalid. Se folosește Europe/Bucharest.")
     display_tz = APP_TZ
@@ -68,53 +86,49 @@ def to_iso_z(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-def parse_iso(dt_str: Optional[str]) -> Optional[datetime]:
-    if not dt_str:
-        return None
-    try:
-        return datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
-    except Exception:
-        return None
+# Address parts in display order (region preferred over county)
+ADDRESS_FIELDS = ["street", "house_number", "locality", "region", "country"]
 
+# Event types whose Address cell shows fuel info instead
+FUEL_EVENT_TYPES = frozenset({"REFUEL", "DRAIN"})
 
-def fmt_dt_local(dt_str: Optional[str]) -> Optional[str]:
-    dt = parse_iso(dt_str)
-    if not dt:
-        return None
-    return dt.astimezone(display_tz).strftime("%Y-%m-%d %H:%M:%S")
-
-
-def join_address(addr: Dict[str, Any]) -> str:
-    """Concatenate address parts similar to trips view."""
-    if not isinstance(addr, dict):
-        return ""
-    parts = [
-        addr.get("street"),
-        addr.get("house_number"),
-        addr.get("locality"),
-        # prefer region, fallback to county
-        addr.get("region") or addr.get("county"),
-        addr.get("country"),
-    ]
-    return ", ".join([p for p in parts if p])
 
+def _join_address_frame(adf: pd.DataFrame) -> pd.Series:
+    """Join address-part columns into one display string per row.
+
+    Vectorized with pandas string ops instead of per-dict joins."""
+    parts = adf.reindex(columns=ADDRESS_FIELDS + ["county"]).astype("string")
+    parts = parts.replace("", pd.NA)
+    # prefer region, fallback to county
+    parts["region"] = parts["region"].fillna(parts["county"])
+    joined = parts[ADDRESS_FIELDS].fillna("").agg(", ".join, axis=1)
+    # collapse slots left empty by missing parts
+    joined = joined.str.replace(r"(,\s*)+", ", ", regex=True).str.strip(", ")
+    return joined.fillna("")
+
+
+def _escape_html_series(s: pd.Series) -> pd.Series:
+    """html.escape over a whole string Series with vectorized replaces."""
+    return (
+        s.str.replace("&", "&amp;", regex=False)
+        .str.replace("<", "&lt;", regex=False)
+        .str.replace(">", "&gt;", regex=False)
+        .str.replace('"', "&quot;", regex=False)
+        .str.replace("'", "&#x27;", regex=False)
+    )
 
-def safe_km(val) -> float:
-    """Convert meters (possibly None/str) to km with 3 decimals; fallback to 0.0."""
-    try:
-        return round(float(val) / 1000.0, 3)
-    except (TypeError, ValueError):
-        return 0.0
 
+def build_tooltip_series(df: pd.DataFrame) -> pd.Series:
+    """Build HTML tooltips for all rows at once from the key/value pairs.
 
-def build_tooltip_html(row: pd.Series) -> str:
-    """Build an HTML tooltip from all row key/value pairs."""
-    parts: List[str] = []
-    for k, v in row.items():
-        key = html.escape(str(k))
-        val = "" if v is None else html.escape(str(v))
-        parts.append(f"<b>{key}</b>: {val}")
-    return "<br/>".join(parts)
+    One concat per column instead of one apply() call per row."""
+    out = pd.Series("", index=df.index, dtype="string")
+    for i, col in enumerate(df.columns):
+        key = html.escape(str(col))
+        vals = _escape_html_series(df[col].astype("string").fillna(""))
+        piece = f"<b>{key}</b>: " + vals
+        out = piece if i == 0 else out + "<br/>" + piece
+    return out
 
 # ===== ADD: imports (felül, a többi import mellé) =====
 from urllib.parse import quote_plus
@@ -159,18 +173,41 @@ def build_gmaps_directions_url(points: List[tuple[float, float]]) -> Optional[st
 # Networking (comments in English)
 # ==========================================
 
-@st.cache_data(show_spinner=False, ttl=300)
-def get_session(api_key: str) -> requests.Session:
+def _build_session() -> requests.Session:
+    """Session with keep-alive pooling and retries for both API hosts."""
     s = requests.Session()
-    s.params = {"version": 1, "api_key": api_key}
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=3, backoff_factor=0.3),
+    )
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
     s.headers.update({"Accept": "application/json"})
     return s
 
 
+@st.cache_resource(show_spinner=False)
+def get_session(api_key: str) -> requests.Session:
+    s = _build_session()
+    s.params = {"version": 1, "api_key": api_key}
+    return s
+
+
+@st.cache_resource(show_spinner=False)
+def get_events_session() -> requests.Session:
+    return _build_session()
+
+
 def handle_response(resp: requests.Response, context: str):
     if resp.status_code == 200:
         try:
-            return resp.json()
+            # Drain the streamed body in large chunks into one buffer, then
+            # hand the raw bytes to orjson (no intermediate str decode)
+            buf = bytearray()
+            for chunk in resp.iter_content(chunk_size=65536):
+                buf.extend(chunk)
+            return orjson.loads(bytes(buf))
         except Exception as e:
             st.error(f"{context}: Eroare la parsarea JSON — {e}")
             return None
@@ -186,7 +223,7 @@ def fetch_vehicles(api_key: str) -> List[Dict[str, Any]]:
         return []
     s = get_session(api_key)
     url = f"{FM_API_BASE}/objects"
-    resp = s.get(url)
+    resp = s.get(url, stream=True)
     st.markdown(f"**API Call:** `{resp.url}`")
     data = handle_response(resp, "Eroare Vehicule API")
     if isinstance(data, list):
@@ -194,8 +231,11 @@ def fetch_vehicles(api_key: str) -> List[Dict[str, Any]]:
     return data or []
 
 
-def fetch_events(vehicle_id: str, from_dt_utc: datetime, to_dt_utc: datetime, stationary_under_min: int, user_id: str) -> List[Dict[str, Any]]:
-    """Fetch events from local API using selected object id as vehicle_id, with x-user-id header."""
+@st.cache_data(show_spinner=False, ttl=300)
+def fetch_events(vehicle_id: str, from_dt_utc: datetime, to_dt_utc: datetime, stationary_under_min: int, user_id: str, cache_bust: int = 0) -> List[Dict[str, Any]]:
+    """Fetch events from local API using selected object id as vehicle_id, with x-user-id header.
+
+    Cached per (vehicle, interval, filter, user); cache_bust forces a refetch."""
     params = {
         "vehicle_id": str(vehicle_id),
         "from": to_iso_z(from_dt_utc),
@@ -203,8 +243,13 @@ def fetch_events(vehicle_id: str, from_dt_utc: datetime, to_dt_utc: datetime, st
         "stationary_under": int(stationary_under_min),
     }
     url = f"{EVENTS_BASE}/events"
-    headers = {"Accept": "application/json", "x-user-id": user_id}
-    resp = requests.get(url, params=params, headers=headers)
+    resp = get_events_session().get(
+        url,
+        params=params,
+        headers={"x-user-id": user_id},
+        timeout=(3.05, 30),
+        stream=True,
+    )
     data = handle_response(resp, "Eroare Events API")
     if isinstance(data, list):
         return data
@@ -214,14 +259,20 @@ def fetch_events(vehicle_id: str, from_dt_utc: datetime, to_dt_utc: datetime, st
 # Vehicle list & selection (kept)
 # ==========================================
 
+@st.cache_data(show_spinner=False)
+def build_vehicle_options(vehicles: List[Dict[str, Any]]) -> Dict[Any, str]:
+    """Map vehicle id -> display label; cached so reruns reuse the built dict."""
+    options: Dict[Any, str] = {}
+    for v in vehicles:
+        vid = v.get("id")
+        name = v.get("name", vid)
+        make = (v.get("vehicle_params") or {}).get("make")
+        options[vid] = f"{name} – {make}" if make else name
+    return options
+
+
 vehicles_list: List[Dict[str, Any]] = fetch_vehicles(api_key) if api_key else []
-vehicle_options = {}
-for v in vehicles_list:
-    vid = v.get("id")
-    name = v.get("name", vid)
-    make = v.get("vehicle_params", {}).get("make")
-    display_name = f"{name} – {make}" if make else name
-    vehicle_options[vid] = display_name
+vehicle_options = build_vehicle_options(vehicles_list)
 
 selected_vehicle = st.sidebar.selectbox(
     "Selectează vehicul",
@@ -233,59 +284,102 @@ selected_vehicle = st.sidebar.selectbox(
 # Data shaping helpers (testable) — comments in English
 # ==========================================
 
-def build_rows(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Transform raw events into table rows (Romanian headers)."""
-    rows: List[Dict[str, Any]] = []
-    for e in events:
-        loc = e.get("location", {}) or {}
-        raw_addr = (loc.get("address", {}) or {})
-        addr = join_address(raw_addr)
-
-        ev_type = (e.get("event_type") or "").upper()
-        # If event is REFUEL or DRAIN, show fuel info in the Address cell
-        if ev_type in {"REFUEL", "DRAIN"}:
-            fls = e.get("fuel_level_start")
-            fle = e.get("fuel_level_end")
-            fld = e.get("fuel_difference")
-            addr = f"{fls} | {fle} | {fld}"
-
-        row = {
-            "Tip eveniment": e.get("event_type"),
-            "Start": fmt_dt_local(e.get("event_start")),
-            "Sfârșit": fmt_dt_local(e.get("event_end")),
-            "Durată": str(timedelta(seconds=int(e.get("duration_sec", 0)))) if e.get("duration_sec") is not None else None,
-            "Lat": loc.get("latitude"),
-            "Lon": loc.get("longitude"),
-            "Adresă": addr,
-            # mileage comes in meters → convert to km with 3 decimals (robust to None)
-            "Kilometraj (pas) [km]": safe_km(e.get("mileage")),
-            "Nivel combustibil": e.get("fuel_level"),
-            "ID șofer": (e.get("driver_ids") or [None])[0],
-            "ID brut": e.get("id"),
-        }
-        rows.append(row)
-    return rows
+def build_rows(events: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Transform raw events into the table DataFrame (Romanian headers).
+
+    One json_normalize pass plus column-wise ops instead of a per-event loop."""
+    if not events:
+        return pd.DataFrame()
+    raw = pd.json_normalize(events)
+
+    def col(name: str) -> pd.Series:
+        # Missing keys normalize to an all-None column
+        if name in raw.columns:
+            return raw[name]
+        return pd.Series([None] * len(raw), index=raw.index, dtype=object)
+
+    addr_prefix = "location.address."
+    adf = raw[[c for c in raw.columns if c.startswith(addr_prefix)]].rename(
+        columns=lambda c: c[len(addr_prefix):]
+    )
+    addr = _join_address_frame(adf)
+
+    ev_type = col("event_type")
+    # If event is REFUEL or DRAIN, show fuel info in the Address cell
+    fuel_mask = ev_type.astype("string").str.upper().isin(FUEL_EVENT_TYPES).fillna(False)
+    if fuel_mask.any():
+        def fuel_col(name: str) -> pd.Series:
+            # json_normalize upcasts int columns to float64 when any row lacks
+            # the key; cast whole numbers back through Int64 so cells render
+            # as '10' and missing values as 'None', like the baseline f-string
+            s = pd.to_numeric(col(name), errors="coerce")
+            txt = s.astype("string")
+            whole = (s % 1 == 0).fillna(False)
+            txt = txt.mask(whole, s.where(whole).astype("Int64").astype("string"))
+            return txt.fillna("None")
+
+        fuel_info = (
+            fuel_col("fuel_level_start")
+            + " | " + fuel_col("fuel_level_end")
+            + " | " + fuel_col("fuel_difference")
+        )
+        addr = addr.mask(fuel_mask, fuel_info)
+
+    duration_sec = pd.to_numeric(col("duration_sec"), errors="coerce")
+    # Keep as timedelta64; formatting happens only at render time
+    durations = pd.to_timedelta(duration_sec.fillna(0).astype("int64"), unit="s").where(
+        duration_sec.notna()
+    )
+
+    def dt_col(name: str) -> pd.Series:
+        # Keep tz-aware datetime64; formatting happens only at render time
+        return pd.to_datetime(col(name), utc=True, errors="coerce").dt.tz_convert(display_tz)
+
+    df = pd.DataFrame({
+        "Tip eveniment": ev_type,
+        "Start": dt_col("event_start"),
+        "Sfârșit": dt_col("event_end"),
+        "Durată": durations,
+        "Lat": col("location.latitude"),
+        "Lon": col("location.longitude"),
+        "Adresă": addr,
+        # mileage comes in meters → convert to km with 3 decimals (robust to None)
+        "Kilometraj (pas) [km]": pd.to_numeric(col("mileage"), errors="coerce").div(1000.0).round(3).fillna(0.0),
+        "Nivel combustibil": col("fuel_level"),
+        "ID șofer": col("driver_ids").str[0],
+        "ID brut": col("id"),
+    })
+    # Arrow-backed dtypes cut memory and speed up string/filter ops; the two
+    # datetime columns stay numpy-backed because ArrowDtype's .dt.strftime
+    # ignores the format string at render time. Fall back silently if pyarrow
+    # is unavailable.
+    try:
+        dt_cols = ["Start", "Sfârșit"]
+        converted = df.drop(columns=dt_cols).convert_dtypes(dtype_backend="pyarrow")
+        df = pd.concat([df[dt_cols], converted], axis=1)[df.columns.tolist()]
+    except Exception:
+        pass
+    return df
 
 
 def sort_and_cumulate(df: pd.DataFrame) -> pd.DataFrame:
     """Sort by Start datetime, keep step mileage and add cumulative column
     next to it, where the first record is always 0 (exclude its step)."""
-    def _sort_key(val: Optional[str]):
-        try:
-            return parse_iso(val) or datetime.min.replace(tzinfo=timezone.utc)
-        except Exception:
-            return datetime.min.replace(tzinfo=timezone.utc)
-
     if not df.empty:
-        # rendezés idő szerint
-        df.sort_values(by=["Start"], key=lambda s: s.map(_sort_key), inplace=True)
+        # rendezés idő szerint — argsort over the raw int64 timestamps skips
+        # sort_values' key/block machinery; NaT is int64-min, so it sorts
+        # first like the old datetime.min fallback did
+        order = df["Start"].to_numpy(dtype="datetime64[ns]").view("int64").argsort(kind="stable")
+        df = df.iloc[order]
         # lépésoszlop -> numerikus
         step_series = pd.to_numeric(df["Kilometraj (pas) [km]"], errors="coerce").fillna(0)
 
         # Kumulatív: az első 0, a továbbiak halmozása az előző kumulativ érték + előző step
-        cumulative = [0]
-        for i in range(1, len(step_series)):
-            cumulative.append(cumulative[i-1] + step_series[i])
+        # One cumsum in sorted (positional) order — the old loop indexed the
+        # shuffled integer labels, so it accumulated steps in pre-sort order
+        steps = step_series.to_numpy(dtype="float64", copy=True)
+        steps[0] = 0.0  # first record is always 0 (exclude its step)
+        cumulative = np.cumsum(steps)
 
         # beszúrás közvetlenül a step oszlop után
         step_idx = df.columns.get_loc("Kilometraj (pas) [km]") + 1
@@ -328,33 +422,46 @@ if run_clicked:
     st.markdown(f"**API Call:** `{preview_url}`")
 
     with st.spinner("Se încarcă evenimentele..."):
-        events = fetch_events(str(selected_vehicle), from_utc, to_utc, stationary_under, user_id)
+        events = fetch_events(
+            str(selected_vehicle),
+            from_utc,
+            to_utc,
+            stationary_under,
+            user_id,
+            cache_bust=st.session_state.events_cache_bust,
+        )
 
     if not events:
         st.info("Nu există evenimente în intervalul selectat.")
         st.stop()
 
-    # Build table rows & dataframe (properly indented inside the click block)
-    rows = build_rows(events)
-    df = pd.DataFrame(rows)
+    # Build the dataframe (properly indented inside the click block)
+    df = build_rows(events)
     df = sort_and_cumulate(df)
 
+    # Format datetimes and durations only here, at render time;
+    # df keeps tz-aware datetime64 / timedelta64 columns
+    df_display = df.copy()
+    for _dt_name in ("Start", "Sfârșit"):
+        df_display[_dt_name] = df_display[_dt_name].dt.strftime("%Y-%m-%d %H:%M:%S")
+    _dur_mask = df_display["Durată"].notna()
+    df_display["Durată"] = (
+        df_display["Durată"].astype(str).str.replace("0 days ", "", regex=False).where(_dur_mask)
+    )
+
     # Display table — use new Streamlit width API (no deprecation warning)
-    st.dataframe(df, height=800, width="stretch")
+    st.dataframe(df_display, height=800, width="stretch")
 
     # Summary footer
     total_events = len(df)
-    # Sum durations by parsing HH:MM:SS strings
-    total_seconds = 0
-    for v in df["Durată"].dropna():
-        try:
-            h, m, s = str(v).split(":")
-            total_seconds += int(h) * 3600 + int(m) * 60 + int(s)
-        except Exception:
-            pass
+    # Durată is already timedelta64 — sum directly, NaT values are skipped
+    total_td = df["Durată"].sum()
+    total_time = timedelta(seconds=int(total_td.total_seconds())) if pd.notna(total_td) else timedelta(0)
 
-    final_km = f"{df['Kilometraj (cumulativ) [km]'].iloc[-1]:.3f}" if not df.empty else "0.000"
-    st.caption(f"Evenimente: {total_events} · Timp total: {timedelta(seconds=total_seconds)} · Kilometraj cumulativ final: {final_km} km")
+    # Read the last value straight from the underlying array (no iloc indexing machinery)
+    cum_vals = df["Kilometraj (cumulativ) [km]"].to_numpy()
+    final_km = f"{cum_vals[-1]:.3f}" if cum_vals.size else "0.000"
+    st.caption(f"Evenimente: {total_events} · Timp total: {total_time} · Kilometraj cumulativ final: {final_km} km")
 
 
     # ==============================
@@ -363,15 +470,19 @@ if run_clicked:
     try:
         import pydeck as pdk
 
-        # Filter rows with valid coordinates
-        df_map = df.copy()
-        df_map = df_map[pd.notnull(df_map["Lat"]) & pd.notnull(df_map["Lon"])]
-        df_map = df_map.astype({"Lat": float, "Lon": float})
+        # Filter rows with valid coordinates in one pass, without the
+        # copy → mask → astype chain (each step re-copied the frame)
+        lat = pd.to_numeric(df_display["Lat"], errors="coerce")
+        lon = pd.to_numeric(df_display["Lon"], errors="coerce")
+        coord_mask = lat.notna() & lon.notna()
+        df_map = df_display.loc[coord_mask].assign(
+            Lat=lat.loc[coord_mask].astype(float),
+            Lon=lon.loc[coord_mask].astype(float),
+        )
 
         if not df_map.empty:
             # Pre-build tooltip HTML containing all row data
-            df_map = df_map.copy()
-            df_map["Tooltip"] = df_map.apply(build_tooltip_html, axis=1)
+            df_map["Tooltip"] = build_tooltip_series(df_map)
 
             # Compute a reasonable initial view (centered on mean lat/lon)
             center_lat = float(df_map["Lat"].mean())
@@ -416,8 +527,8 @@ if run_clicked:
             if not df_map.empty:
                 route_points = list(zip(df_map["Lat"].astype(float), df_map["Lon"].astype(float)))
         else:
-            # Fallback: df-ből, ha df_map nincs
-            _tmp = df.copy()
+            # Fallback: df_display-ből, ha df_map nincs
+            _tmp = df_display.copy()
             _tmp = _tmp[pd.notnull(_tmp["Lat"]) & pd.notnull(_tmp["Lon"])]
             if not _tmp.empty:
                 route_points = list(zip(_tmp["Lat"].astype(float), _tmp["Lon"].astype(float)))